@@ -1,20 +1,35 @@
 import os
 import hashlib
+import hmac
 import base64
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import csv
+import atexit
+import threading
+import time
 from pathlib import Path
 from datetime import datetime, timedelta, date, timezone
-from typing import Dict, Any, Tuple, List
+from typing import Dict, Any, Tuple, List, Optional
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 import streamlit as st
 import io
+import re
 import xlsxwriter
 import calendar
 from dateutil.relativedelta import relativedelta
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+except ImportError:  # Optional: without pyarrow daily files are parsed by pandas and the history is rebuilt from the CSVs
+    pa = pacsv = pq = None
 
 # ========================================
 # 1. PAGE CONFIGURATION
@@ -35,12 +50,14 @@ if "dark_mode" not in st.session_state:
 # ========================================
 # 3. CSS STYLING (DYNAMIC LIGHT/DARK)
 # ========================================
-def inject_css():
+@st.cache_resource(show_spinner=False)
+def build_css(dark: bool) -> str:
     """
-    Injects professional CSS based on the current Light/Dark mode state.
+    Professional CSS for the Light/Dark mode palette.
     Handles all UI elements including Cards, Tables, Tabs, and Text.
+    Only two variants exist, so the formatted stylesheet is built (and minified) once per mode and reused on every rerun.
     """
-    if st.session_state["dark_mode"]:
+    if dark:
         # DARK MODE PALETTE
         bg_color = "#0f172a"          # Slate 900
         text_color = "#f8fafc"        # Slate 50
@@ -57,7 +74,7 @@ def inject_css():
         sidebar_bg = "#ffffff"        # White
         secondary_text = "#64748b"    # Slate 500
 
-    st.markdown(f"""
+    css = f"""
     <style>
         @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap');
         
@@ -182,7 +199,15 @@ def inject_css():
             text-align: center;
         }}
     </style>
-    """, unsafe_allow_html=True)
+    """
+    # Comments and indentation are dropped so each rerun ships the compact stylesheet
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s*([{};])\s*", r"\1", css)
+    return re.sub(r"\s+", " ", css).strip()
+
+def inject_css():
+    """Injects the stylesheet for the current Light/Dark mode state."""
+    st.markdown(build_css(st.session_state["dark_mode"]), unsafe_allow_html=True)
 
 inject_css()
 
@@ -192,6 +217,15 @@ inject_css()
 DATA_DIR = Path("data")
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 LOG_FILE = DATA_DIR / "access_logs.csv"
+# Audit events are buffered and appended in one write once this many are queued, or at most this many seconds later
+LOG_BUFFER_SIZE = 20
+LOG_FLUSH_INTERVAL = 2.0
+# Events with these prefixes are written at once, so a crash or restart cannot drop a sign-in or deletion record
+LOG_IMMEDIATE_EVENTS = ("Login", "Logout", "Deleted")
+# Parallel readers used when the history frame is rebuilt from the daily CSVs
+HISTORY_LOAD_WORKERS = 8
+# Columnar snapshot of the combined history (derived from the CSVs, never pushed); survives app restarts
+COMBINED_FILE = DATA_DIR / "_combined.parquet"
 FORECAST_DIR = DATA_DIR / "forecasts"
 # Ensure forecasts directory exists
 FORECAST_DIR.mkdir(parents=True, exist_ok=True)
@@ -200,23 +234,37 @@ REQUIRED_COLS = ["Plant", "Production for the Day", "Accumulative Production"]
 # CONFIGURATION SECRETS
 SECRETS = {}
 try: SECRETS = dict(st.secrets)
-except: SECRETS = {}
+except Exception: SECRETS = {}
 
 GITHUB_TOKEN = SECRETS.get("GITHUB_TOKEN") or os.getenv("GITHUB_TOKEN")
 GITHUB_REPO = SECRETS.get("GITHUB_REPO") or os.getenv("GITHUB_REPO")
 GITHUB_USER = SECRETS.get("GITHUB_USER") or os.getenv("GITHUB_USER", "streamlit-bot")
 GITHUB_EMAIL = SECRETS.get("GITHUB_EMAIL") or os.getenv("GITHUB_EMAIL", "streamlit@example.com")
+# (connect, read) seconds for GitHub API calls, so a stalled request can't hang the Save button
+GITHUB_TIMEOUT = (3, 10)
 
-_default_users = {
-    "admin": hashlib.sha256("kbrc123".encode()).hexdigest(),
-    "manager": hashlib.sha256("sjk@2025".encode()).hexdigest(),
-    "production": hashlib.sha256("Production@123".encode()).hexdigest()
-}
+def _decode_digest(hex_digest: str) -> bytes:
+    """Raw SHA-256 bytes of a stored hex digest; a malformed entry decodes to b"" and can never match"""
+    try: return bytes.fromhex(str(hex_digest))
+    except ValueError: return b""
 
-USERS: Dict[str, str] = _default_users.copy()
-if "USERS" in SECRETS and isinstance(SECRETS["USERS"], dict):
-    for k, v in SECRETS["USERS"].items():
-        USERS[k] = v
+@st.cache_resource(show_spinner=False)
+def load_user_digests(secret_users: Tuple[Tuple[str, str], ...]) -> Dict[str, bytes]:
+    """
+    Raw password digests per user (defaults overridden by the USERS secret), built once per process.
+    Keyed on the secret entries, so an edited secrets file still takes effect.
+    """
+    _default_users = {
+        "admin": hashlib.sha256("kbrc123".encode()).hexdigest(),
+        "manager": hashlib.sha256("sjk@2025".encode()).hexdigest(),
+        "production": hashlib.sha256("Production@123".encode()).hexdigest()
+    }
+    users = {**_default_users, **dict(secret_users)}
+    # Decoded once here instead of hex-encoding every login attempt
+    return {u: _decode_digest(h) for u, h in users.items()}
+
+_secret_users = SECRETS.get("USERS")
+USER_DIGESTS = load_user_digests(tuple(_secret_users.items()) if isinstance(_secret_users, dict) else ())
 
 # ========================================
 # 5. LOGIC & UTILITY FUNCTIONS
@@ -225,34 +273,78 @@ def get_kuwait_time():
     """Returns current time in Kuwait (UTC+3)"""
     return datetime.now(timezone.utc) + timedelta(hours=3)
 
-def get_greeting():
-    h = get_kuwait_time().hour
-    if h < 12: return "Good Morning"
-    elif 12 <= h < 18: return "Good Afternoon"
-    else: return "Good Evening"
+# Greeting for each hour of the day: morning before 12:00, afternoon until 18:00, evening after
+GREETINGS = ("Good Morning",) * 12 + ("Good Afternoon",) * 6 + ("Good Evening",) * 6
+
+def get_greeting(now: Optional[datetime] = None) -> str:
+    return GREETINGS[(now or get_kuwait_time()).hour]
 
 def format_m3(value):
     """Standardized formatting for Cubic Meters"""
     return f"{value:,.3f} m³"
 
+def join_html_blocks(blocks: List[str]) -> str:
+    """Joins HTML/markdown snippets into one st.markdown body, each snippet kept as its own block"""
+    return "\n\n".join(b.strip() for b in blocks)
+
 def init_logs():
     if not LOG_FILE.exists():
         with open(LOG_FILE, 'w', newline='') as f:
             csv.writer(f).writerow(["Timestamp", "User", "Event"])
 
+init_logs()
+
+def _write_pending_logs(pending: Dict[str, Any]):
+    with pending["lock"]:
+        rows = pending["rows"]
+        if rows:
+            try:
+                with open(LOG_FILE, 'a', newline='') as f:
+                    csv.writer(f).writerows(rows)
+                rows.clear()
+            except OSError: pass
+        pending["last_flush"] = time.monotonic()
+
+@st.cache_resource
+def _pending_logs() -> Dict[str, Any]:
+    """Audit events not yet written, shared by all sessions so none are lost when a browser tab just closes"""
+    pending = {"rows": [], "lock": threading.Lock(), "last_flush": time.monotonic()}
+    # Whatever is still queued when the server shuts down is written on the way out
+    atexit.register(_write_pending_logs, pending)
+    return pending
+
+def flush_logs():
+    """Appends all buffered audit events to the log file in a single write"""
+    _write_pending_logs(_pending_logs())
+
 def log_event(username: str, event: str):
-    init_logs()
-    try:
-        # Use Kuwait Time for logging
-        ts = get_kuwait_time().strftime("%Y-%m-%d %H:%M:%S")
-        with open(LOG_FILE, 'a', newline='') as f:
-            csv.writer(f).writerow([ts, username, event])
-    except: pass
+    # Use Kuwait Time for logging
+    ts = get_kuwait_time().strftime("%Y-%m-%d %H:%M:%S")
+    pending = _pending_logs()
+    immediate = event.startswith(LOG_IMMEDIATE_EVENTS)
+    with pending["lock"]:
+        pending["rows"].append((ts, username, event))
+        due = len(pending["rows"]) >= LOG_BUFFER_SIZE or time.monotonic() - pending["last_flush"] > LOG_FLUSH_INTERVAL
+        # The first event queued arms a timer, so it is written even if no other event follows
+        if len(pending["rows"]) == 1 and not (due or immediate):
+            timer = threading.Timer(LOG_FLUSH_INTERVAL, _write_pending_logs, args=(pending,))
+            timer.daemon = True
+            timer.start()
+    if due or immediate: flush_logs()
+
+@st.cache_data(show_spinner=False, ttl=60)
+def _read_logs(mtime: float) -> pd.DataFrame:
+    """Parsed access log in time order, memoized until the log file changes (mtime is the cache key)"""
+    # Timestamps are parsed and sorted here, once per file version, instead of on every Audit Logs render
+    logs = pd.read_csv(LOG_FILE, parse_dates=['Timestamp'], dtype={'User': 'category', 'Event': 'string'})
+    return logs.sort_values('Timestamp', kind='stable', ignore_index=True)
 
 def get_logs() -> pd.DataFrame:
     init_logs()
-    try: return pd.read_csv(LOG_FILE)
-    except: return pd.DataFrame(columns=["Timestamp", "User", "Event"])
+    # Make pending events visible in the audit view
+    flush_logs()
+    try: return _read_logs(LOG_FILE.stat().st_mtime)
+    except Exception: return pd.DataFrame(columns=["Timestamp", "User", "Event"])
 
 # --- FORECAST FUNCTIONS (UPDATED - TEXT FILE BASED) ---
 def get_forecast_file_path(year: int, month: int) -> Path:
@@ -285,6 +377,16 @@ def save_forecast_value(year: int, month: int, forecast_value: float) -> Tuple[b
     except Exception as e:
         return False, f"Error saving forecast: {str(e)}"
 
+@st.cache_data(show_spinner=False, ttl=300)
+def _read_forecast(year: int, month: int, mtime: float) -> float:
+    """Forecast file contents, memoized until the file changes (mtime is the cache key)"""
+    with open(get_forecast_file_path(year, month), 'r') as f:
+        content = f.read().strip()
+        if content:
+            return float(content)
+        else:
+            return 0.0
+
 def get_forecast(year: int, month: int) -> float:
     """Get forecast value for specific month and year from text file"""
     try:
@@ -292,12 +394,7 @@ def get_forecast(year: int, month: int) -> float:
         if not file_path.exists():
             return 0.0
         
-        with open(file_path, 'r') as f:
-            content = f.read().strip()
-            if content:
-                return float(content)
-            else:
-                return 0.0
+        return _read_forecast(year, month, file_path.stat().st_mtime)
     except Exception as e:
         print(f"Error reading forecast: {e}")
         return 0.0
@@ -321,7 +418,7 @@ def list_available_forecasts() -> List[Tuple[int, int, float]]:
                 year = int(parts[2])
                 forecast_val = get_forecast(year, month)
                 forecasts.append((year, month, forecast_val))
-        except:
+        except ValueError:
             continue
     return sorted(forecasts, key=lambda x: (x[0], x[1]), reverse=True)
 
@@ -348,8 +445,9 @@ def calculate_daily_target(monthly_forecast: float, year: int, month: int) -> fl
 def check_credentials(username: str, password: str) -> bool:
     if not username: return False
     user = username.strip()
-    if user in USERS:
-        v = hashlib.sha256(password.encode()).hexdigest() == USERS[user]
+    if user in USER_DIGESTS:
+        # Constant-time comparison of raw digests
+        v = hmac.compare_digest(hashlib.sha256(password.encode()).digest(), USER_DIGESTS[user])
         log_event(user, "Login Success" if v else "Login Failed")
         return v
     return False
@@ -361,30 +459,195 @@ def save_csv(df: pd.DataFrame, date_obj: date, overwrite: bool = False) -> Path:
     df.to_csv(p, index=False, float_format="%.3f")
     return p
 
-def list_saved_dates() -> List[str]:
-    """List all saved dates, filtering only valid YYYY-MM-DD format files"""
-    valid_dates = []
-    for p in DATA_DIR.glob("*.csv"):
-        if "access_logs" in p.name or p.parent == FORECAST_DIR:
+@st.cache_data(show_spinner=False, ttl=30)
+def _scan_saved_dates(dir_mtime: float) -> Dict[str, date]:
+    """
+    Scans DATA_DIR for YYYY-MM-DD.csv files and parses each name once.
+    Keyed on the directory mtime, which changes whenever a file is added or deleted.
+    """
+    valid_dates = {}
+    # scandir yields bare directory entries (no Path object per file); forecasts live in a subdirectory, not here
+    with os.scandir(DATA_DIR) as entries:
+        names = [e.name for e in entries if e.name.endswith(".csv")]
+    for name in names:
+        if "access_logs" in name:
             continue
         
         # Extract date from filename
-        date_str = p.name.replace(".csv", "")
+        date_str = name[:-4]
         
-        # Validate YYYY-MM-DD format
+        # Validate YYYY-MM-DD format (fromisoformat also accepts other ISO forms, hence the round-trip check)
         try:
-            datetime.strptime(date_str, "%Y-%m-%d")
-            valid_dates.append(date_str)
+            d = date.fromisoformat(date_str)
         except ValueError:
             # Skip files that don't match the date format
             continue
+        if d.isoformat() == date_str:
+            valid_dates[date_str] = d
     
-    return sorted(valid_dates, reverse=True)
+    return dict(sorted(valid_dates.items(), reverse=True))
+
+def saved_dates_index() -> Dict[str, date]:
+    """Saved date strings (newest first) mapped to their parsed dates"""
+    return _scan_saved_dates(DATA_DIR.stat().st_mtime)
+
+def list_saved_dates() -> List[str]:
+    """List all saved dates, filtering only valid YYYY-MM-DD format files"""
+    return list(saved_dates_index())
+
+# Bounded to roughly a year of daily files; superseded (date, old mtime) entries age out
+@st.cache_data(show_spinner=False, max_entries=365)
+def _load_saved_cached(date_str: str, mtime: float) -> pd.DataFrame:
+    """Parsed daily CSV, memoized across reruns until the file changes (mtime is the cache key)"""
+    path = DATA_DIR / f"{date_str}.csv"
+    if pacsv is not None:
+        # Arrow's C++ reader parses a cold file ~2.5x faster than pandas; Date and Plant stay text as in the pandas read
+        opts = pacsv.ConvertOptions(column_types={'Date': pa.string(), 'Plant': pa.string()}, strings_can_be_null=True)
+        df = pacsv.read_csv(path, convert_options=opts).to_pandas()
+        if 'Plant' in df.columns:
+            df['Plant'] = df['Plant'].astype('category')
+    else:
+        df = pd.read_csv(path, dtype={'Plant': 'category', 'Date': str})
+    # A file without a Date column is returned as read
+    if 'Date' not in df.columns:
+        return df
+    # A daily file's rows all carry the file's own date, so it is set directly; anything else is parsed in
+    # whatever layout it has, and a cell that still doesn't parse takes the file's date rather than failing the day
+    if (df['Date'] == date_str).all():
+        df['Date'] = np.datetime64(date_str, 'ns')
+    else:
+        df['Date'] = pd.to_datetime(df['Date'], errors='coerce', cache=True).fillna(pd.Timestamp(date_str))
+    return df
 
 def load_saved(date_str: str) -> pd.DataFrame:
     p = DATA_DIR / f"{date_str}.csv"
     if not p.exists(): raise FileNotFoundError("File missing")
-    return pd.read_csv(p)
+    return _load_saved_cached(date_str, p.stat().st_mtime)
+
+def drop_total_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Removes summary rows (any Plant containing 'TOTAL', case-insensitive).
+    For a categorical Plant only the distinct categories are scanned, not every row.
+    """
+    plant = df['Plant']
+    if isinstance(plant.dtype, pd.CategoricalDtype):
+        cats = plant.cat.categories
+        is_total = plant.isin(cats[cats.astype(str).str.contains("TOTAL", case=False, regex=False)])
+        out = df[~is_total]
+        return out.assign(Plant=out['Plant'].cat.remove_unused_categories())
+    return df[~plant.astype(str).str.contains("TOTAL", case=False, regex=False)]
+
+def saved_file_keys(dates: List[str]) -> Tuple[Tuple[str, float], ...]:
+    """(date, mtime) pairs for the given saved dates, used as the cache key of build_history"""
+    return tuple((d, (DATA_DIR / f"{d}.csv").stat().st_mtime) for d in dates)
+
+@st.cache_resource(show_spinner=False)
+def _unreadable_files() -> set:
+    """(date, mtime) keys whose CSV failed to parse; skipped until the file is replaced (its mtime changes)"""
+    return set()
+
+def _load_saved_or_none(key: Tuple[str, float]) -> Optional[pd.DataFrame]:
+    """Worker for build_history: a missing or unreadable day is skipped rather than failing the whole load"""
+    bad = _unreadable_files()
+    if key in bad: return None
+    d, mtime = key
+    try:
+        return _load_saved_cached(d, mtime)
+    except Exception:
+        # Failures aren't cached by st.cache_data, so remember them rather than reparsing on every rebuild
+        bad.add(key)
+        return None
+
+def history_signature(file_keys: Tuple[Tuple[str, float], ...]) -> str:
+    """Fingerprint of the saved-file set; stamped into the Parquet snapshot to detect staleness"""
+    return hashlib.sha1(repr(file_keys).encode()).hexdigest()
+
+def _read_combined(signature: str) -> Optional[pd.DataFrame]:
+    """The Parquet snapshot if it was built from exactly these files, else None"""
+    if pq is None or not COMBINED_FILE.exists(): return None
+    try:
+        meta = pq.read_schema(COMBINED_FILE).metadata or {}
+        if meta.get(b"history_signature") != signature.encode(): return None
+        return pq.read_table(COMBINED_FILE).to_pandas()
+    except Exception:
+        return None
+
+def _write_combined(df: pd.DataFrame, signature: str) -> None:
+    """Stores the snapshot with its signature in the file metadata; written to a temp file then swapped in"""
+    if pq is None: return
+    try:
+        table = pa.Table.from_pandas(df)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"history_signature": signature.encode()})
+        tmp = COMBINED_FILE.with_suffix(".tmp")
+        pq.write_table(table, tmp)
+        tmp.replace(COMBINED_FILE)
+    except Exception: pass
+
+@st.cache_data(show_spinner=False)
+def build_history(file_keys: Tuple[Tuple[str, float], ...]) -> pd.DataFrame:
+    """
+    Concatenates every saved day into one frame (TOTAL rows removed, Date parsed).
+    Cached on the (date, mtime) signature so it is only rebuilt when a file is added, changed or deleted;
+    a fresh process loads the Parquet snapshot instead of re-parsing every CSV.
+    """
+    signature = history_signature(file_keys)
+    combined = _read_combined(signature)
+    if combined is not None: return combined
+    full_df = concat_days(file_keys)
+    if not full_df.empty: _write_combined(full_df, signature)
+    return full_df
+
+def concat_days(file_keys: Tuple[Tuple[str, float], ...]) -> pd.DataFrame:
+    """Loads and concatenates the given saved days (TOTAL rows removed, Date parsed); shared by build_history and analytics_frame"""
+    # read_csv releases the GIL during I/O, so cold reads overlap; warm days come straight from the per-file cache
+    with ThreadPoolExecutor(max_workers=HISTORY_LOAD_WORKERS) as ex:
+        frames = [f for f in ex.map(_load_saved_or_none, file_keys) if f is not None]
+    if not frames: return pd.DataFrame()
+    full_df = pd.concat(frames, ignore_index=True, sort=False)
+    # Per-file categories differ, so concat falls back to object; re-categorize once on the combined column
+    full_df['Plant'] = full_df['Plant'].astype('category')
+    full_df = drop_total_rows(full_df)
+    # Raw volume cells can mix numbers with stray text (e.g. ' ,'); hold such columns as strings so they
+    # store columnar and the snapshot reads back identical. safe_numeric coerces them downstream either way.
+    return full_df.astype({c: "string" for c in full_df.columns if full_df[c].dtype == object})
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def analytics_frame(file_keys: Tuple[Tuple[str, float], ...], start_d: date, end_d: date) -> pd.DataFrame:
+    """
+    History restricted to [start_d, end_d], numerics cleaned and one row per (Date, Plant).
+    Cached per (files, range), so reruns that only touch widgets skip the slice/fill/dedupe work.
+    """
+    # Filenames are the dates, so out-of-range days are dropped before anything is read; the whole
+    # (snapshot-backed) history is only used when the range covers every saved day
+    sd, ed = start_d.isoformat(), end_d.isoformat()
+    in_range = tuple(k for k in file_keys if sd <= k[0] <= ed)
+    full_df = build_history(file_keys) if len(in_range) == len(file_keys) else concat_days(in_range)
+    if full_df.empty: return full_df
+    # STRICT FILTERING (Removes unwanted dates from Oct if not selected)
+    mask = (full_df['Date'] >= pd.to_datetime(start_d)) & (full_df['Date'] <= pd.to_datetime(end_d))
+    # sort_values already returns a new frame, so safe_numeric can convert it in place without an extra copy
+    df = full_df[mask].sort_values('Date')
+    if df.empty: return df
+    df = safe_numeric(df, copy=False)
+    # Deduplicate to prevent math errors
+    return df.drop_duplicates(subset=['Date', 'Plant'], keep='last')
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def period_aggregates(file_keys: Tuple[Tuple[str, float], ...], start_d: date, end_d: date, freq: str) -> pd.DataFrame:
+    """Per-plant total, average and peak accumulative for each period bin (freq e.g. 'W-MON' or 'MS') of analytics_frame"""
+    df = analytics_frame(file_keys, start_d, end_d)
+    # Named aggregation yields the final flat column names directly (no MultiIndex to build and rename).
+    # pandas 1.5 ignores the groupby sort when observed=True, so sort_index keeps plants in category order
+    # (the order that fixes each plant's chart colour).
+    agg = df.groupby(['Plant', pd.Grouper(key='Date', freq=freq)], observed=True).agg(**{
+        'Total Production': ('Production for the Day', 'sum'),
+        'Avg Production': ('Production for the Day', 'mean'),
+        'Accumulative': ('Accumulative Production', 'max')
+    }).sort_index().reset_index()
+    # Only periods that end by end_d are shown, so a trailing partial week or month is left out.
+    # Weekly bins are labelled by their last day, month-start bins by their first.
+    period_end = agg['Date'] + pd.offsets.MonthEnd(0) if freq == 'MS' else agg['Date']
+    return agg[period_end <= pd.to_datetime(end_d)]
 
 def delete_saved(date_str: str) -> bool:
     p = DATA_DIR / f"{date_str}.csv"
@@ -393,6 +656,20 @@ def delete_saved(date_str: str) -> bool:
         return True
     return False
 
+@st.cache_resource(show_spinner=False)
+def get_github_session() -> requests.Session:
+    """Pooled keep-alive session for the GitHub API, shared across reruns so pushes reuse one TLS connection"""
+    session = requests.Session()
+    # Retry failed connects and transient 5xx on the sha lookup; PUTs are not resent (they create commits)
+    retry = Retry(total=3, connect=3, backoff_factor=0.5, status_forcelist=(502, 503, 504),
+                  allowed_methods=frozenset({"GET"}))
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=retry))
+    session.headers.update({
+        "Authorization": f"token {GITHUB_TOKEN}",
+        "Accept": "application/vnd.github.v3+json"
+    })
+    return session
+
 def attempt_git_push(file_path: Path, msg: str) -> Tuple[bool, str]:
     if not GITHUB_TOKEN or not GITHUB_REPO: 
         return False, "Git not configured"
@@ -418,11 +695,8 @@ def attempt_git_push(file_path: Path, msg: str) -> Tuple[bool, str]:
             return False, f"File missing: {file_path}"
         
         # Check if file exists in GitHub
-        headers = {
-            "Authorization": f"token {GITHUB_TOKEN}",
-            "Accept": "application/vnd.github.v3+json"
-        }
-        resp = requests.get(url, headers=headers)
+        gh = get_github_session()
+        resp = gh.get(url, timeout=GITHUB_TIMEOUT)
         sha = resp.json().get("sha") if resp.status_code == 200 else None
         
         # Prepare payload
@@ -440,7 +714,7 @@ def attempt_git_push(file_path: Path, msg: str) -> Tuple[bool, str]:
             payload["sha"] = sha
         
         # Upload to GitHub
-        r = requests.put(url, headers=headers, json=payload)
+        r = gh.put(url, json=payload, timeout=GITHUB_TIMEOUT)
         
         if r.status_code == 201 or r.status_code == 200:
             return True, f"Successfully pushed to GitHub: {relative_path}"
@@ -452,32 +726,97 @@ def attempt_git_push(file_path: Path, msg: str) -> Tuple[bool, str]:
     except Exception as e: 
         return False, f"Error pushing to GitHub: {str(e)}"
 
-def safe_numeric(df: pd.DataFrame) -> pd.DataFrame:
-    df2 = df.copy()
-    df2["Production for the Day"] = pd.to_numeric(df2["Production for the Day"], errors="coerce").fillna(0.0)
+def _fill_within_groups(values: np.ndarray, codes: np.ndarray, order_key: np.ndarray = None) -> np.ndarray:
+    """
+    Forward then backward fill NaNs inside each group (numpy equivalent of groupby ffill().bfill()).
+    Within a group rows are filled in order_key order when given, otherwise in row order.
+    """
+    if order_key is not None:
+        order = np.argsort(order_key, kind="stable")
+        order = order[np.argsort(codes[order], kind="stable")]
+    else:
+        order = np.argsort(codes, kind="stable")
+    vals = values[order]
+    n = len(vals)
+    if n == 0:
+        return values.copy()
+    pos = np.arange(n)
+    sorted_codes = codes[order]
+    # Segment boundaries: each position where the group code changes
+    starts = np.flatnonzero(np.diff(sorted_codes, prepend=sorted_codes[0] - 1))
+    ends = np.append(starts[1:], n) - 1
+
+    # Forward fill: carry the index of the last valid value, reset at each segment start
+    idx = np.where(np.isnan(vals), 0, pos)
+    idx[starts] = starts
+    np.maximum.accumulate(idx, out=idx)
+    vals = vals[idx]
+
+    # Backward fill: same pass over the reversed positions, reset at each segment end
+    idx = np.where(np.isnan(vals), n - 1, pos)
+    idx[ends] = ends
+    idx = np.minimum.accumulate(idx[::-1])[::-1]
+    vals = vals[idx]
+
+    out = np.empty_like(vals)
+    out[order] = vals
+    return out
+
+def safe_numeric(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
+    """Coerce volumes, fill Accumulative per plant and compact dtypes.
+    Pass copy=False when the caller owns a freshly built frame; it is then converted in place."""
+    df2 = df.copy() if copy else df
+    if "Date" in df2.columns and not pd.api.types.is_datetime64_any_dtype(df2["Date"]):
+        df2["Date"] = pd.to_datetime(df2["Date"], cache=True)
+    # String-dtype columns (from the history snapshot) coerce to nullable Float64; both volumes end up plain float64
+    df2["Production for the Day"] = pd.to_numeric(df2["Production for the Day"], errors="coerce").fillna(0.0).astype("float64")
     df2["Accumulative Production"] = pd.to_numeric(df2["Accumulative Production"], errors="coerce")
-    df2["Accumulative Production"] = df2.groupby("Plant")["Accumulative Production"].transform(lambda x: x.ffill().bfill())
+    codes, _ = pd.factorize(df2["Plant"])
+    # Fill along the timeline when the frame carries dates, so an unsorted frame still fills chronologically
+    order_key = df2["Date"].to_numpy() if "Date" in df2.columns else None
+    filled = _fill_within_groups(df2["Accumulative Production"].to_numpy(dtype="float64", na_value=np.nan), codes, order_key)
+    # Rows without a Plant belong to no group and stay unfilled
+    filled[codes < 0] = np.nan
+    df2["Accumulative Production"] = filled
+    # Categorical Plant for the analytics pipeline; volumes stay float64, since cumulative m³ need more than float32's ~7 digits
+    df2["Plant"] = df2["Plant"].astype("category")
     return df2
 
-def generate_excel_report(df: pd.DataFrame, date_str: str):
+def csv_bytes(df: pd.DataFrame) -> bytes:
+    """CSV export written straight into a byte buffer, without building the whole text as a str first"""
     output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+    df.to_csv(output, index=False)
+    return output.getvalue()
+
+def generate_excel_report(df: pd.DataFrame, date_str: str) -> bytes:
+    """Excel export of one day's records"""
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter', datetime_format='yyyy-mm-dd') as writer:
         df.to_excel(writer, sheet_name='Data', index=False, float_format="%.3f")
         workbook = writer.book
         worksheet = writer.sheets['Data']
         format_num = workbook.add_format({'num_format': '#,##0.000 "m³"'})
         worksheet.set_column('B:C', 18, format_num)
-    output.seek(0)
-    return output
+    return output.getvalue()
+
+@st.cache_data(show_spinner=False, max_entries=365)
+def saved_excel_report(date_str: str, mtime: float) -> bytes:
+    """Excel export of a saved day, cached per (date, mtime) so re-renders skip both the read and the workbook build"""
+    return generate_excel_report(_load_saved_cached(date_str, mtime), date_str)
 
 def generate_smart_insights(df):
     """
     INNOVATION: Automatically generates text-based insights for the Executive Summary.
     """
-    total = df['Production for the Day'].sum()
-    top_plant = df.groupby('Plant')['Production for the Day'].sum().idxmax() if not df.empty else "N/A"
-    top_val = df.groupby('Plant')['Production for the Day'].sum().max() if not df.empty else 0
-    avg = df['Production for the Day'].mean() if not df.empty else 0
+    if df.empty:
+        total, top_plant, top_val, avg = 0, "N/A", 0, 0
+    else:
+        # One grouped pass; total/top plant/top value all come from the small per-plant series
+        plant_totals = df.groupby('Plant', observed=True)['Production for the Day'].sum()
+        total = plant_totals.sum()
+        top_plant = plant_totals.idxmax()
+        top_val = plant_totals.max()
+        avg = df['Production for the Day'].mean()
     
     insight = f"**Executive Summary:** The total production for this period stands at **{format_m3(total)}**. "
     insight += f"The leading facility is **{top_plant}**, contributing **{format_m3(top_val)}** to the total output. "
@@ -487,63 +826,113 @@ def generate_smart_insights(df):
 # ========================================
 # 6. CHARTING ENGINE
 # ========================================
-def get_theme_colors(theme_name):
-    # Professional Solid Colors
-    themes = {
-        "Neon Cyber": ["#F72585", "#7209B7", "#3A0CA3", "#4361EE", "#4CC9F0"], # Bright/Neon
-        "Executive Blue": ["#1E40AF", "#3B82F6", "#60A5FA", "#93C5FD", "#BFDBFE"], # Solid Blues
-        "Emerald City": ["#065F46", "#10B981", "#34D399", "#6EE7B7", "#A7F3D0"], # Solid Greens
-        "Royal Purple": ["#581C87", "#7C3AED", "#8B5CF6", "#A78BFA", "#C4B5FD"], # Solid Purples
-        "Crimson Tide": ["#991B1B", "#DC2626", "#EF4444", "#F87171", "#FCA5A5"]  # Solid Reds
-    }
-    return themes.get(theme_name, themes["Neon Cyber"])
+# Professional Solid Colors (tuples, so a palette can be passed straight into cache keys)
+THEME_COLORS = {
+    "Neon Cyber": ("#F72585", "#7209B7", "#3A0CA3", "#4361EE", "#4CC9F0"), # Bright/Neon
+    "Executive Blue": ("#1E40AF", "#3B82F6", "#60A5FA", "#93C5FD", "#BFDBFE"), # Solid Blues
+    "Emerald City": ("#065F46", "#10B981", "#34D399", "#6EE7B7", "#A7F3D0"), # Solid Greens
+    "Royal Purple": ("#581C87", "#7C3AED", "#8B5CF6", "#A78BFA", "#C4B5FD"), # Solid Purples
+    "Crimson Tide": ("#991B1B", "#DC2626", "#EF4444", "#F87171", "#FCA5A5")  # Solid Reds
+}
 
-def get_week_range(date_obj):
-    """Get week range string (Dec 1 - Dec 7 format)"""
-    start_of_week = date_obj - timedelta(days=date_obj.weekday())
-    end_of_week = start_of_week + timedelta(days=6)
-    start_str = start_of_week.strftime('%b %d')
-    end_str = end_of_week.strftime('%b %d')
-    return f"{start_str} - {end_str}"
+def get_theme_colors(theme_name) -> Tuple[str, ...]:
+    return THEME_COLORS.get(theme_name, THEME_COLORS["Neon Cyber"])
 
-def apply_chart_theme(fig, x_axis_title="Date Range"):
+def get_week_range(dates: pd.Series) -> pd.Series:
+    """Get week range strings (Dec 1 - Dec 7 format) for a whole datetime column at once"""
+    start_of_week = dates - pd.to_timedelta(dates.dt.weekday, unit='D')
+    end_of_week = start_of_week + pd.Timedelta(days=6)
+    return start_of_week.dt.strftime('%b %d') + " - " + end_of_week.dt.strftime('%b %d')
+
+@st.cache_resource
+def get_chart_template(dark: bool) -> go.layout.Template:
     """
-    Applies the professional layout to charts.
-    Ensures labels/legends are readable in both Dark and Light modes.
+    Builds the shared chart layout once per Light/Dark mode.
+    Starts from Plotly's default template so trace styling and colorscales stay unchanged.
     """
-    dark = st.session_state["dark_mode"]
     # Dynamic text color based on mode
     text_col = "#ffffff" if dark else "#1e293b"
     # Subtle grid lines
     grid_col = "rgba(255, 255, 255, 0.1)" if dark else "rgba(0, 0, 0, 0.05)"
     
-    fig.update_layout(
+    template = go.layout.Template(pio.templates["plotly"])
+    template.layout.update(
         font=dict(family="Inter", size=12, color=text_col),
         plot_bgcolor="rgba(0,0,0,0)",
         paper_bgcolor="rgba(0,0,0,0)",
-        margin=dict(t=30, b=10, l=10, r=10),
-        xaxis=dict(showgrid=False, linecolor=grid_col, tickfont=dict(color=text_col), title=x_axis_title),
+        xaxis=dict(showgrid=False, linecolor=grid_col, tickfont=dict(color=text_col)),
         yaxis=dict(showgrid=True, gridcolor=grid_col, linecolor=grid_col, tickfont=dict(color=text_col), 
-                   tickformat=',.3f', title="Production Volume (m³)"), 
+                   tickformat=',.3f'), 
         legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1, font=dict(color=text_col)),
-        hovermode="x unified"
+        hovermode="x unified",
+        # No tweening between redraws; charts are re-rendered wholesale on every rerun
+        transition=dict(duration=0)
     )
-    
-    # Force tooltip to show Plant Name instead of just date or index
-    # We update traces to look for customdata or specific text
-    fig.update_traces(
-        hovertemplate="<b>%{x}</b><br>Value: %{y:,.3f} m³<br>Plant: %{text}<extra></extra>" if 'text' in fig.data[0] else None
+    return template
+
+def apply_chart_theme(fig, x_axis_title="Date Range", dark=None):
+    """
+    Applies the professional layout to charts.
+    Ensures labels/legends are readable in both Dark and Light modes.
+    `dark` defaults to the session's mode; cached figure builders pass it explicitly.
+    """
+    if dark is None:
+        dark = st.session_state["dark_mode"]
+    # Margin and titles stay explicit because Plotly Express sets its own, which would win over the template
+    fig.update_layout(
+        template=get_chart_template(dark),
+        margin=dict(t=30, b=10, l=10, r=10),
+        xaxis_title=x_axis_title,
+        yaxis_title="Production Volume (m³)"
     )
+    # Unstroked markers on line charts: one less path per point to draw
+    fig.update_traces(marker_line_width=0, selector=lambda t: t.type in ("scatter", "scattergl"))
     return fig
 
+# Upper bound on points per line trace; longer series are downsampled with LTTB
+MAX_CHART_POINTS = 1000
+
+def lttb_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling for an evenly spaced series.
+    Returns the positions of n_out points that keep the visual shape of y (first and last always kept).
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=float)
+    every = (n - 2) / (n_out - 2)
+    out = np.empty(n_out, dtype=int)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        # Average of the next bucket is the third triangle vertex
+        nxt_start = int((i + 1) * every) + 1
+        nxt_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[nxt_start:nxt_end].mean()
+        avg_y = y[nxt_start:nxt_end].mean()
+        # Keep the point of the current bucket forming the largest triangle with the previous pick
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        out[i + 1] = a
+    return out
+
 def create_forecast_vs_actual_chart(daily_data, forecast_data, title="Actual vs Expected Production"):
     """
     Create a line chart comparing actual production vs expected production
     """
+    # Long date ranges are thinned to MAX_CHART_POINTS; both lines keep the same dates
+    if len(daily_data) > MAX_CHART_POINTS:
+        idx = lttb_indices(daily_data['Total Production'].to_numpy(dtype=float), MAX_CHART_POINTS)
+        daily_data = daily_data.iloc[idx]
+        forecast_data = forecast_data.iloc[idx]
+    
     fig = go.Figure()
     
     # Add actual production line (Blue)
-    fig.add_trace(go.Scatter(
+    fig.add_trace(go.Scattergl(
         x=daily_data['Date'],
         y=daily_data['Total Production'],
         mode='lines+markers',
@@ -554,7 +943,7 @@ def create_forecast_vs_actual_chart(daily_data, forecast_data, title="Actual vs
     ))
     
     # Add expected production line (Red)
-    fig.add_trace(go.Scatter(
+    fig.add_trace(go.Scattergl(
         x=daily_data['Date'],
         y=forecast_data['Expected Production'],
         mode='lines+markers',
@@ -574,6 +963,339 @@ def create_forecast_vs_actual_chart(daily_data, forecast_data, title="Actual vs
     
     return fig
 
+# Hover text of the per-plant weekly/monthly charts, keyed by (period, metric)
+PERIOD_HOVER = {
+    (period, metric): f"<b>{period}: %{{x}}</b><br>Plant: %{{text}}<br>{metric}: %{{y:,.3f}} m³<extra></extra>"
+    for period in ("Week", "Month") for metric in ("Total", "Average", "Accumulative")
+}
+
+def build_grouped_bar(df: pd.DataFrame, x: str, y: str, colors: List[str], title: str, hovertemplate: str) -> go.Figure:
+    """
+    Grouped bar chart with one go.Bar per Plant, labelled with the plant name (the px.bar(color='Plant', text='Plant') look).
+    Traces are built directly from each plant's slice and handed to the Figure in one go, skipping Plotly Express's frame reshaping.
+    """
+    traces = [
+        go.Bar(x=g[x], y=g[y], name=plant, legendgroup=plant, text=g['Plant'], textposition='auto',
+               marker_color=colors[i % len(colors)], hovertemplate=hovertemplate)
+        for i, (plant, g) in enumerate(df.groupby('Plant', observed=True, sort=True))
+    ]
+    return go.Figure(data=traces, layout=dict(title=title, barmode='group', legend=dict(title_text='Plant', tracegroupgap=0)))
+
+def build_plant_lines(df: pd.DataFrame, x: str, y: str, colors: List[str], title: str, hovertemplate: str) -> go.Figure:
+    """
+    One WebGL line (with markers and plant-name labels) per Plant; the line counterpart of build_grouped_bar.
+    A plant series longer than MAX_CHART_POINTS is LTTB-downsampled so wide ranges stay light in the browser.
+    """
+    traces = []
+    for i, (plant, g) in enumerate(df.groupby('Plant', observed=True, sort=True)):
+        if len(g) > MAX_CHART_POINTS:
+            g = g.iloc[lttb_indices(np.nan_to_num(g[y].to_numpy(dtype=float)), MAX_CHART_POINTS)]
+        traces.append(go.Scattergl(x=g[x], y=g[y], name=plant, legendgroup=plant, mode='lines+markers+text', text=g['Plant'],
+                                   line=dict(color=colors[i % len(colors)], dash='solid'), marker=dict(symbol='circle'),
+                                   hovertemplate=hovertemplate))
+    return go.Figure(data=traces, layout=dict(title=title, legend=dict(title_text='Plant', tracegroupgap=0)))
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def weekly_figures(file_keys: Tuple[Tuple[str, float], ...], start_d: date, end_d: date,
+                   colors: Tuple[str, ...], dark: bool) -> Dict[str, go.Figure]:
+    """
+    Themed Weekly Performance charts, built once per (files, range, palette, mode).
+    Reruns with the same inputs hand the same figure objects straight to st.plotly_chart.
+    """
+    week_agg = period_aggregates(file_keys, start_d, end_d, 'W-MON')
+    colors = list(colors)
+    
+    # Format Date Label with Week Range (Dec 1 - Dec 7 format)
+    week_agg['Week Range'] = get_week_range(week_agg['Date'])
+    week_agg['Week Label'] = week_agg['Week Range']
+    
+    # Chart 1: Weekly Total Production (Sum)
+    fig1 = build_grouped_bar(week_agg, 'Week Label', 'Total Production', colors, "Weekly Total Production (Sum)",
+                             PERIOD_HOVER["Week", "Total"])
+    
+    # Chart 2: Weekly Average Production (Mean)
+    fig2 = build_grouped_bar(week_agg, 'Week Label', 'Avg Production', colors, "Weekly Average Production (Mean)",
+                             PERIOD_HOVER["Week", "Average"])
+    
+    # Chart 3: Weekly Production Trend (Line)
+    fig3 = build_plant_lines(week_agg, 'Week Label', 'Total Production', colors, "Weekly Production Trend",
+                             PERIOD_HOVER["Week", "Total"])
+    
+    # Chart 4: Weekly Production Distribution (Area)
+    fig4 = px.area(week_agg, x='Week Label', y='Total Production', color='Plant',
+                  title="Weekly Production Distribution",
+                  text='Plant',
+                  color_discrete_sequence=colors)
+    fig4.update_traces(hovertemplate=PERIOD_HOVER["Week", "Total"])
+    
+    # Weekly Accumulative Trend
+    fig_acc = build_plant_lines(week_agg, 'Week Label', 'Accumulative', colors, "Weekly Accumulative Production",
+                                PERIOD_HOVER["Week", "Accumulative"])
+    
+    figs = {"total": fig1, "avg": fig2, "trend": fig3, "area": fig4, "acc": fig_acc}
+    return {k: apply_chart_theme(f, dark=dark) for k, f in figs.items()}
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def monthly_figures(file_keys: Tuple[Tuple[str, float], ...], start_d: date, end_d: date,
+                    colors: Tuple[str, ...], dark: bool) -> Dict[str, go.Figure]:
+    """Themed Monthly Performance charts (everything except the forecast trajectory), cached like weekly_figures"""
+    month_agg = period_aggregates(file_keys, start_d, end_d, 'MS')
+    colors = list(colors)
+    month_agg['Month Label'] = month_agg['Date'].dt.strftime('%B %Y')
+    
+    # Chart 1: Monthly Total Production (Sum)
+    fig_m1 = build_grouped_bar(month_agg, 'Month Label', 'Total Production', colors, "Monthly Total Production (Sum)",
+                               PERIOD_HOVER["Month", "Total"])
+    
+    # Chart 2: Monthly Average Production (Mean)
+    fig_m2 = build_grouped_bar(month_agg, 'Month Label', 'Avg Production', colors, "Monthly Average Production (Mean)",
+                               PERIOD_HOVER["Month", "Average"])
+    
+    # Chart 3: Monthly Production Stacked Area
+    fig_m3 = px.area(month_agg, x='Month Label', y='Total Production', color='Plant',
+                    title="Monthly Production Distribution (Stacked)",
+                    text='Plant',
+                    color_discrete_sequence=colors)
+    fig_m3.update_traces(hovertemplate=PERIOD_HOVER["Month", "Total"])
+    
+    # Chart 4: Monthly Production Heatmap
+    # Create pivot table for heatmap
+    pivot_df = month_agg.pivot_table(
+        index='Plant', 
+        columns='Month Label', 
+        values='Total Production',
+        aggfunc='sum',
+        observed=True
+    ).fillna(0)
+    
+    fig_m4 = px.imshow(
+        pivot_df,
+        labels=dict(x="Month", y="Plant", color="Production"),
+        title="Monthly Production Heatmap by Plant",
+        aspect="auto"
+    )
+    fig_m4.update_xaxes(side="top")
+    
+    # Monthly Accumulative Trend
+    fig_acc_m = build_plant_lines(month_agg, 'Month Label', 'Accumulative', colors, "Monthly Accumulative Production",
+                                  PERIOD_HOVER["Month", "Accumulative"])
+    
+    figs = {"total": fig_m1, "avg": fig_m2, "area": fig_m3, "heatmap": fig_m4, "acc": fig_acc_m}
+    return {k: apply_chart_theme(f, dark=dark) for k, f in figs.items()}
+
+@st.fragment
+def render_archive_day(file_dates: Dict[str, date], colors: List[str]):
+    """
+    Date picker and charts of the Historical Archives view.
+    Runs as a fragment: picking another date reruns only this block, not the whole app.
+    file_dates maps each saved date string (newest first) to its parsed date.
+    """
+    dark = st.session_state["dark_mode"]
+    # Initialize session state with the newest record, or today's date if there is none
+    if "hist_d" not in st.session_state:
+        st.session_state.hist_d = next(iter(file_dates.values()), datetime.today().date())
+    
+    # Create a dropdown with formatted dates for better UX (already sorted newest first)
+    formatted_dates = [(d, f"{d.strftime('%B %d, %Y')} ({f})") for f, d in file_dates.items()]
+    
+    if not formatted_dates:
+        st.error("No valid date files found.")
+        return
+    
+    # Create dropdown options
+    date_options = [fd[1] for fd in formatted_dates]
+    
+    # Find current selection index
+    current_index = 0
+    for i, (d, _) in enumerate(formatted_dates):
+        if d == st.session_state.hist_d:
+            current_index = i
+            break
+    
+    # Date selection with dropdown
+    selected_option = st.selectbox(
+        "Select Date", 
+        options=date_options,
+        index=current_index,
+        key="hist_date_select"
+    )
+    
+    # Find the selected date
+    sel_d = None
+    for d, option in formatted_dates:
+        if option == selected_option:
+            sel_d = d
+            break
+    
+    if sel_d is None:
+        sel_d = formatted_dates[0][0]
+    
+    st.session_state.hist_d = sel_d
+    d_str = sel_d.strftime("%Y-%m-%d")
+    
+    if d_str in file_dates:
+        df = load_saved(d_str)
+        df = drop_total_rows(df)
+        df = safe_numeric(df, copy=False)
+        tot = df["Production for the Day"].sum()
+        
+        # Get forecast for this day's month
+        month_forecast = get_forecast(sel_d.year, sel_d.month)
+        days_in_month = calendar.monthrange(sel_d.year, sel_d.month)[1]
+        expected_daily = month_forecast / days_in_month if days_in_month > 0 else 0
+        
+        st.markdown(f"""
+        <div style="background:{'#1e293b' if dark else '#1e3a8a'}; color:white; padding:30px; border-radius:12px; margin-bottom:20px;">
+            <h2 style="margin:0; color:white !important;">{sel_d.strftime('%A, %B %d, %Y')}</h2>
+            <div style="font-size:3rem; font-weight:800;">{format_m3(tot)}</div>
+            <div style="font-size:1rem; margin-top:10px;">
+                Expected Daily: <span style="font-weight:600;">{format_m3(expected_daily)}</span> | 
+                Monthly Forecast: <span style="font-weight:600;">{format_m3(month_forecast)}</span>
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+        st.dataframe(df, use_container_width=True,
+                     column_config={"Date": st.column_config.DateColumn(format="YYYY-MM-DD")})
+        
+        # One row per plant for the share/volume charts (Plotly would otherwise aggregate raw rows client-side)
+        plant_totals = df.groupby('Plant', observed=True, sort=False, as_index=False)[
+            ['Production for the Day', 'Accumulative Production']].sum()
+        
+        st.markdown("### 📊 Daily Analysis")
+        c1, c2 = st.columns(2)
+        with c1:
+            st.markdown("**Production Share**")
+            fig = px.pie(plant_totals, names='Plant', values='Production for the Day', color_discrete_sequence=colors)
+            fig.update_traces(hovertemplate='<b>%{label}</b><br>Production: %{value:,.3f} m³<extra></extra>')
+            st.plotly_chart(apply_chart_theme(fig, dark=dark), use_container_width=True)
+        with c2:
+            st.markdown("**Production Volume**")
+            fig = px.bar(plant_totals, x='Plant', y='Production for the Day', color='Plant', text='Plant', color_discrete_sequence=colors)
+            fig.update_traces(hovertemplate='<b>%{x}</b><br>Production: %{y:,.3f} m³<extra></extra>')
+            st.plotly_chart(apply_chart_theme(fig, dark=dark), use_container_width=True)
+            
+        st.markdown("### 📈 Accumulative Analysis")
+        c3, c4 = st.columns(2)
+        with c3:
+            st.markdown("**Accumulative by Plant**")
+            fig_acc_bar = px.bar(plant_totals, x='Plant', y='Accumulative Production', color='Plant', text='Plant', color_discrete_sequence=colors)
+            fig_acc_bar.update_traces(hovertemplate='<b>%{x}</b><br>Accumulative: %{y:,.3f} m³<extra></extra>')
+            st.plotly_chart(apply_chart_theme(fig_acc_bar, dark=dark), use_container_width=True)
+        with c4:
+            st.markdown("**Accumulative Share**")
+            fig_acc_pie = px.pie(plant_totals, names='Plant', values='Accumulative Production', color_discrete_sequence=colors)
+            fig_acc_pie.update_traces(hovertemplate='<b>%{label}</b><br>Accumulative: %{value:,.3f} m³<extra></extra>')
+            st.plotly_chart(apply_chart_theme(fig_acc_pie, dark=dark), use_container_width=True)
+        
+        # NEW: Actual vs Expected Chart for Historical View
+        st.markdown("### 🎯 Actual vs Expected Production")
+        
+        # Create comparison data
+        comparison_data = pd.DataFrame({
+            'Metric': ['Actual Production', 'Expected Production'],
+            'Value': [tot, expected_daily],
+            'Color': ['#3b82f6', '#ef4444']
+        })
+        
+        fig_comparison = px.bar(
+            comparison_data, 
+            x='Metric', 
+            y='Value', 
+            color='Metric',
+            title=f"Daily Production Comparison for {sel_d.strftime('%B %d, %Y')}",
+            color_discrete_map={'Actual Production': '#3b82f6', 'Expected Production': '#ef4444'},
+            text=comparison_data['Value'].apply(lambda x: format_m3(x))
+        )
+        fig_comparison.update_traces(textposition='outside', hovertemplate='<b>%{x}</b><br>%{y:,.3f} m³<extra></extra>')
+        fig_comparison.update_layout(showlegend=False)
+        st.plotly_chart(apply_chart_theme(fig_comparison, dark=dark), use_container_width=True)
+
+def render_weekly_tab(file_keys: Tuple[Tuple[str, float], ...], start_d: date, end_d: date, colors: List[str]):
+    """Weekly Performance tab, drawn from the cached weekly figures"""
+    st.subheader("Weekly Analytics")
+    week_figs = weekly_figures(file_keys, start_d, end_d, tuple(colors), st.session_state["dark_mode"])
+
+    # NEW: Additional charts for Production of the Day
+    st.markdown("#### 📊 Weekly Production Analysis")
+
+    # Create 4 charts in a 2x2 grid
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.plotly_chart(week_figs["total"], use_container_width=True)
+        st.plotly_chart(week_figs["trend"], use_container_width=True)
+
+    with col2:
+        st.plotly_chart(week_figs["avg"], use_container_width=True)
+        st.plotly_chart(week_figs["area"], use_container_width=True)
+
+    # Weekly Accumulative Trend
+    st.markdown("#### 📈 Weekly Accumulative Trend")
+    st.plotly_chart(week_figs["acc"], use_container_width=True)
+
+def render_monthly_tab(file_keys: Tuple[Tuple[str, float], ...], start_d: date, end_d: date, colors: List[str],
+                       daily_comparison: pd.DataFrame):
+    """Monthly Performance tab (forecast trajectory plus the cached monthly charts)"""
+    st.subheader("Monthly Analytics")
+    dark = st.session_state["dark_mode"]
+
+    # Monthly Trajectory Chart
+    st.markdown("#### 🎯 Monthly Trajectory: Actual vs Forecast")
+    if not daily_comparison.empty:
+        # Calculate monthly cumulative
+        daily_comparison['Month'] = daily_comparison['Date'].dt.strftime('%B %Y')
+        monthly_cum = daily_comparison.groupby('Month').agg({
+            'Total Production': 'sum',
+            'Expected Production': 'sum'
+        }).reset_index()
+
+        fig_traj = go.Figure()
+        fig_traj.add_trace(go.Bar(
+            x=monthly_cum['Month'],
+            y=monthly_cum['Total Production'],
+            name='Actual Production',
+            marker_color='#3b82f6',
+            text=monthly_cum['Total Production'].apply(lambda x: f"{x:,.0f}"),
+            textposition='outside',
+            hovertemplate='<b>%{x}</b><br>Actual: %{y:,.3f} m³<extra></extra>'
+        ))
+        fig_traj.add_trace(go.Bar(
+            x=monthly_cum['Month'],
+            y=monthly_cum['Expected Production'],
+            name='Expected Production',
+            marker_color='#ef4444',
+            text=monthly_cum['Expected Production'].apply(lambda x: f"{x:,.0f}"),
+            textposition='outside',
+            hovertemplate='<b>%{x}</b><br>Expected: %{y:,.3f} m³<extra></extra>'
+        ))
+
+        fig_traj.update_layout(
+            title="Monthly Actual vs Expected Production",
+            barmode='group',
+            yaxis_title="Production Volume (m³)"
+        )
+        st.plotly_chart(apply_chart_theme(fig_traj, dark=dark), use_container_width=True)
+
+    # Standard Monthly Charts
+    month_figs = monthly_figures(file_keys, start_d, end_d, tuple(colors), dark)
+
+    # NEW: Additional charts for Monthly analysis
+    st.markdown("#### 📊 Monthly Production Analysis")
+
+    col_m1, col_m2 = st.columns(2)
+
+    with col_m1:
+        st.plotly_chart(month_figs["total"], use_container_width=True)
+        st.plotly_chart(month_figs["area"], use_container_width=True)
+
+    with col_m2:
+        st.plotly_chart(month_figs["avg"], use_container_width=True)
+        st.plotly_chart(month_figs["heatmap"], use_container_width=True)
+
+    # Monthly Accumulative Trend
+    st.markdown("#### 📈 Monthly Accumulative Trend")
+    st.plotly_chart(month_figs["acc"], use_container_width=True)
+
 # ========================================
 # 7. MAIN APPLICATION LOGIC
 # ========================================
@@ -604,10 +1326,14 @@ if not st.session_state.get("logged_in", False):
 
 # SIDEBAR CONFIGURATION
 user = st.session_state["username"]
+# Read once per run; the toggle's on_change callback updates it before the script starts
+dark_mode = st.session_state["dark_mode"]
+# One clock reading per run, shared by the greeting and the forecast panel (audit events still stamp their own time)
+current_time = get_kuwait_time()
 st.sidebar.markdown(f"""
-<div style="padding:20px; border-radius:12px; border:1px solid #e2e8f0; margin-bottom:20px; background-color: {'#1e293b' if st.session_state['dark_mode'] else '#ffffff'};">
-    <div style="color:#64748b; font-size:0.8rem; font-weight:600; text-transform:uppercase;">{get_greeting()}</div>
-    <div style="color:{'#f8fafc' if st.session_state['dark_mode'] else '#0f172a'}; font-size:1.4rem; font-weight:800; margin-top:4px;">{user.title()}</div>
+<div style="padding:20px; border-radius:12px; border:1px solid #e2e8f0; margin-bottom:20px; background-color: {'#1e293b' if dark_mode else '#ffffff'};">
+    <div style="color:#64748b; font-size:0.8rem; font-weight:600; text-transform:uppercase;">{get_greeting(current_time)}</div>
+    <div style="color:{'#f8fafc' if dark_mode else '#0f172a'}; font-size:1.4rem; font-weight:800; margin-top:4px;">{user.title()}</div>
     <div style="margin-top:10px; display:flex; align-items:center;">
         <span style="height:10px; width:10px; background-color:#10b981; border-radius:50%; margin-right:8px; display:inline-block;"></span>
         <span style="color:#10b981; font-size:0.8rem; font-weight:600;">System Active</span>
@@ -622,7 +1348,6 @@ mode = st.sidebar.radio("Navigation", menu)
 st.sidebar.markdown("---")
 
 # --- FORECAST DISPLAY (ALL USERS) ---
-current_time = get_kuwait_time()
 current_month_forecast = get_forecast(current_time.year, current_time.month)
 current_month_name = calendar.month_name[current_time.month]
 
@@ -718,18 +1443,19 @@ if user == "manager":
 st.sidebar.markdown("---")
 
 # DARK MODE TOGGLE
-is_dark = st.sidebar.toggle("🌙 Dark Mode", value=st.session_state["dark_mode"])
-if is_dark != st.session_state["dark_mode"]:
-    st.session_state["dark_mode"] = is_dark
-    st.rerun()
+# The callback runs before the next script run, so inject_css() already sees the new mode (no second rerun)
+def _sync_dark_mode():
+    st.session_state["dark_mode"] = st.session_state["dark_mode_toggle"]
+
+st.sidebar.toggle("🌙 Dark Mode", value=dark_mode, key="dark_mode_toggle", on_change=_sync_dark_mode)
 
 # THEME SELECTOR
 theme_sel = st.sidebar.selectbox("Chart Theme", 
-                                 ["Neon Cyber", "Executive Blue", "Emerald City", "Royal Purple", "Crimson Tide"],
-                                 index=["Neon Cyber", "Executive Blue", "Emerald City", "Royal Purple", "Crimson Tide"].index(st.session_state.get("theme", "Neon Cyber")))
+                                 list(THEME_COLORS),
+                                 index=list(THEME_COLORS).index(st.session_state.get("theme", "Neon Cyber")))
 if theme_sel != st.session_state.get("theme"):
+    # Colors are read below in this same run, so no extra rerun is needed
     st.session_state["theme"] = theme_sel
-    st.rerun()
 
 current_theme_colors = get_theme_colors(st.session_state.get("theme", "Neon Cyber"))
 alert_threshold = st.sidebar.number_input("Alert Threshold (m³)", 50.0, step=10.0)
@@ -755,36 +1481,20 @@ if mode == "Analytics":
     with c1: start_d = st.date_input("Start Date", value=datetime.today() - timedelta(days=30))
     with c2: end_d = st.date_input("End Date", value=datetime.today())
     
-    # DATA LOADING
-    frames = []
-    for d in saved:
-        try:
-            df = load_saved(d)
-            df['Date'] = pd.to_datetime(df['Date'])
-            df = df[~df['Plant'].astype(str).str.upper().str.contains("TOTAL")] 
-            frames.append(df)
-        except: continue
-        
-    if not frames: st.stop()
-    full_df = pd.concat(frames, ignore_index=True)
-    
-    # STRICT FILTERING (Removes unwanted dates from Oct if not selected)
-    mask = (full_df['Date'] >= pd.to_datetime(start_d)) & (full_df['Date'] <= pd.to_datetime(end_d))
-    df_filtered = full_df[mask].copy().sort_values('Date')
+    # DATA LOADING (cached until a saved file changes or the range moves)
+    file_keys = saved_file_keys(saved)
+    df_filtered = analytics_frame(file_keys, start_d, end_d)
     
     if df_filtered.empty:
         st.info("No data available for the selected date range.")
         st.stop()
-        
-    df_filtered = safe_numeric(df_filtered)
-    # Deduplicate to prevent math errors
-    df_filtered = df_filtered.drop_duplicates(subset=['Date', 'Plant'], keep='last')
     
     # Calculate total production for the BIG BOX
     total_production = df_filtered['Production for the Day'].sum()
     
     # --- BIG TOTAL PRODUCTION BOX ---
-    st.markdown(f"""
+    # The box, hero banner and leaderboard heading are sent together as one markdown element (below)
+    summary_blocks = [f"""
     <div class="total-production-box">
         <div style="font-size:1.2rem; opacity:0.9; margin-bottom:10px;">📊 TOTAL PRODUCTION</div>
         <div style="font-size:4rem; font-weight:900; margin:20px 0;">{format_m3(total_production)}</div>
@@ -792,53 +1502,52 @@ if mode == "Analytics":
             Date Range: {start_d.strftime('%b %d, %Y')} to {end_d.strftime('%b %d, %Y')}
         </div>
     </div>
-    """, unsafe_allow_html=True)
+    """]
 
     # --- FORECAST CALCULATION ---
     # Get forecasts for the selected date range
     forecasts = get_forecast_for_date_range(start_d, end_d)
     
     # Calculate expected production for each day based on monthly forecasts
-    daily_expected = []
-    current_date = start_d
-    
-    while current_date <= end_d:
-        monthly_forecast = get_forecast(current_date.year, current_date.month)
-        days_in_month = calendar.monthrange(current_date.year, current_date.month)[1]
-        daily_target = monthly_forecast / days_in_month if days_in_month > 0 else 0
-        
-        daily_expected.append({
-            'Date': pd.Timestamp(current_date),
-            'Expected Production': daily_target
-        })
-        current_date += timedelta(days=1)
-    
-    daily_expected_df = pd.DataFrame(daily_expected)
+    # (one forecast lookup per month in range; the per-day column is a vectorized map)
+    expected_days = pd.date_range(start_d, end_d, freq='D')
+    expected_months = pd.Series(expected_days.to_period('M'))
+    month_daily_target = {p: get_forecast(p.year, p.month) / p.days_in_month for p in expected_months.unique()}
+    daily_expected_df = pd.DataFrame({
+        'Date': expected_days,
+        'Expected Production': expected_months.map(month_daily_target).to_numpy(dtype='float64')
+    })
     
     # Calculate actual daily totals
-    daily_actual_df = df_filtered.groupby('Date')['Production for the Day'].sum().reset_index()
-    daily_actual_df.columns = ['Date', 'Total Production']
+    # One grouped pass; the hero figures below reuse this series instead of rescanning
+    daily_sum = df_filtered.groupby('Date', sort=True)['Production for the Day'].sum()
+    daily_actual_df = daily_sum.rename('Total Production').reset_index()
     
     # Merge actual and expected
     daily_comparison = pd.merge(daily_actual_df, daily_expected_df, on='Date', how='left')
     daily_comparison['Expected Production'] = daily_comparison['Expected Production'].fillna(0)
     
     # --- TOP 3 LEADERBOARD CALCULATION ---
+    # Sum and average per plant from one grouped pass; ties keep plant order, as the sorted head(3) did
+    plant_stats = df_filtered.groupby("Plant", observed=True)["Production for the Day"].agg(['sum', 'mean'])
     # Top 3 by Sum
-    top_sum = df_filtered.groupby("Plant")["Production for the Day"].sum().sort_values(ascending=False).head(3)
+    top_sum = plant_stats['sum'].nlargest(3)
     # Top 3 by Average
-    top_avg = df_filtered.groupby("Plant")["Production for the Day"].mean().sort_values(ascending=False).head(3)
+    top_avg = plant_stats['mean'].nlargest(3)
 
     # --- FORECAST HERO SECTION ---
     # Determine the "Dominant" month in selection
     if not daily_comparison.empty:
-        dom_month_idx = daily_comparison['Date'].dt.month.mode()[0]
-        dom_year_idx = daily_comparison['Date'].dt.year.mode()[0]
+        # Most frequent month / year over the days in range (ties go to the earliest, as .mode() did);
+        # a bincount over the small daily index instead of two value-count passes
+        day_months, day_years = daily_sum.index.month.to_numpy(), daily_sum.index.year.to_numpy()
+        dom_month_idx = int(np.bincount(day_months).argmax())
+        dom_year_idx = int(day_years.min() + np.bincount(day_years - day_years.min()).argmax())
         month_name = calendar.month_name[dom_month_idx]
         
         monthly_target = get_forecast(dom_year_idx, dom_month_idx)
-        total_vol = daily_comparison['Total Production'].sum()
-        avg_daily = daily_comparison['Total Production'].mean()
+        total_vol = daily_sum.sum()
+        avg_daily = daily_sum.mean()
         expected_avg = daily_comparison['Expected Production'].mean()
         
         # Calculate Variance
@@ -847,7 +1556,7 @@ if mode == "Analytics":
         var_icon = "▲" if variance >= 0 else "▼"
         
         # ------------------ HERO SECTION ------------------
-        st.markdown(f"""
+        summary_blocks.append(f"""
         <div class="hero-banner">
             <div style="display:grid; grid-template-columns: 1fr 1fr 1fr; gap:20px; text-align:center;">
                 <div>
@@ -869,17 +1578,19 @@ if mode == "Analytics":
                 </div>
             </div>
         </div>
-        """, unsafe_allow_html=True)
+        """)
 
     # ------------------ LEADERBOARDS ------------------
-    st.markdown("### 🏆 Top Performance Leaders")
+    summary_blocks.append("### 🏆 Top Performance Leaders")
+    st.markdown(join_html_blocks(summary_blocks), unsafe_allow_html=True)
     col_l1, col_l2 = st.columns(2)
     
     with col_l1:
-        st.markdown("**Highest Total Production**")
+        # Title and rows are sent as one markdown element rather than one per plant
+        rows = ["**Highest Total Production**"]
         for i, (plant, val) in enumerate(top_sum.items()):
             color = current_theme_colors[i % len(current_theme_colors)]
-            st.markdown(f"""
+            rows.append(f"""
             <div class="leaderboard-box" style="border-left-color: {color};">
                 <div>
                     <span class="lb-rank" style="color:{color}">#{i+1}</span>
@@ -887,13 +1598,14 @@ if mode == "Analytics":
                 </div>
                 <span class="lb-val">{format_m3(val)}</span>
             </div>
-            """, unsafe_allow_html=True)
+            """)
+        st.markdown(join_html_blocks(rows), unsafe_allow_html=True)
             
     with col_l2:
-        st.markdown("**Highest Average Efficiency**")
+        rows = ["**Highest Average Efficiency**"]
         for i, (plant, val) in enumerate(top_avg.items()):
             color = current_theme_colors[-(i+1) % len(current_theme_colors)] # Reverse colors for distinction
-            st.markdown(f"""
+            rows.append(f"""
             <div class="leaderboard-box" style="border-left-color: {color};">
                 <div>
                     <span class="lb-rank" style="color:{color}">#{i+1}</span>
@@ -901,209 +1613,26 @@ if mode == "Analytics":
                 </div>
                 <span class="lb-val">{format_m3(val)}/day</span>
             </div>
-            """, unsafe_allow_html=True)
-
-    st.markdown("---")
+            """)
+        st.markdown(join_html_blocks(rows), unsafe_allow_html=True)
 
     # ------------------ ACTUAL VS EXPECTED CHART ------------------
-    st.markdown("### 📈 Actual vs Expected Production")
+    st.markdown("---\n\n### 📈 Actual vs Expected Production")
     if not daily_comparison.empty:
         fig_comparison = create_forecast_vs_actual_chart(daily_comparison, daily_comparison)
-        st.plotly_chart(apply_chart_theme(fig_comparison), use_container_width=True)
+        st.plotly_chart(apply_chart_theme(fig_comparison, dark=dark_mode), use_container_width=True)
 
     # TABS FOR WEEKLY / MONTHLY SPLIT
+    # Both tabs render on every run; their aggregates and figures come from cache, so this stays cheap
     tab_week, tab_month = st.tabs(["📅 Weekly Performance", "📆 Monthly Performance"])
 
     # --- WEEKLY ANALYSIS ---
     with tab_week:
-        st.subheader("Weekly Analytics")
-        # Aggregation Logic
-        week_agg = df_filtered.groupby(['Plant', pd.Grouper(key='Date', freq='W-MON')]).agg({
-            'Production for the Day': ['sum', 'mean'],
-            'Accumulative Production': 'max'
-        }).reset_index()
-        week_agg.columns = ['Plant', 'Date', 'Total Production', 'Avg Production', 'Accumulative']
-        
-        # Format Date Label with Week Range (Dec 1 - Dec 7 format)
-        week_agg['Week Range'] = week_agg['Date'].apply(lambda x: get_week_range(x))
-        week_agg['Week Label'] = week_agg['Week Range']
-        
-        # Post-Aggregation Filter (Double Check)
-        week_agg = week_agg[(week_agg['Date'] >= pd.to_datetime(start_d)) & (week_agg['Date'] <= pd.to_datetime(end_d))]
-
-        # NEW: Additional charts for Production of the Day
-        st.markdown("#### 📊 Weekly Production Analysis")
-        
-        # Create 4 charts in a 2x2 grid
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            # Chart 1: Weekly Total Production (Sum)
-            fig1 = px.bar(week_agg, x='Week Label', y='Total Production', color='Plant', 
-                         title="Weekly Total Production (Sum)", barmode='group',
-                         text='Plant',
-                         color_discrete_sequence=current_theme_colors)
-            fig1.update_traces(
-                hovertemplate='<b>Week: %{x}</b><br>Plant: %{text}<br>Total: %{y:,.3f} m³<extra></extra>'
-            )
-            st.plotly_chart(apply_chart_theme(fig1), use_container_width=True)
-            
-            # NEW Chart 3: Weekly Production Trend (Line)
-            fig3 = px.line(week_agg, x='Week Label', y='Total Production', color='Plant', markers=True,
-                          title="Weekly Production Trend",
-                          text='Plant',
-                          color_discrete_sequence=current_theme_colors)
-            fig3.update_traces(
-                hovertemplate='<b>Week: %{x}</b><br>Plant: %{text}<br>Total: %{y:,.3f} m³<extra></extra>'
-            )
-            st.plotly_chart(apply_chart_theme(fig3), use_container_width=True)
-            
-        with col2:
-            # Chart 2: Weekly Average Production (Mean)
-            fig2 = px.bar(week_agg, x='Week Label', y='Avg Production', color='Plant', 
-                         title="Weekly Average Production (Mean)", barmode='group',
-                         text='Plant',
-                         color_discrete_sequence=current_theme_colors)
-            fig2.update_traces(
-                hovertemplate='<b>Week: %{x}</b><br>Plant: %{text}<br>Average: %{y:,.3f} m³<extra></extra>'
-            )
-            st.plotly_chart(apply_chart_theme(fig2), use_container_width=True)
-            
-            # NEW Chart 4: Weekly Production Distribution (Area)
-            fig4 = px.area(week_agg, x='Week Label', y='Total Production', color='Plant',
-                          title="Weekly Production Distribution",
-                          text='Plant',
-                          color_discrete_sequence=current_theme_colors)
-            fig4.update_traces(
-                hovertemplate='<b>Week: %{x}</b><br>Plant: %{text}<br>Total: %{y:,.3f} m³<extra></extra>'
-            )
-            st.plotly_chart(apply_chart_theme(fig4), use_container_width=True)
-        
-        # Weekly Accumulative Trend
-        st.markdown("#### 📈 Weekly Accumulative Trend")
-        fig_acc = px.line(week_agg, x='Week Label', y='Accumulative', color='Plant', markers=True,
-                          title="Weekly Accumulative Production",
-                          text='Plant',
-                          color_discrete_sequence=current_theme_colors)
-        fig_acc.update_traces(
-            hovertemplate='<b>Week: %{x}</b><br>Plant: %{text}<br>Accumulative: %{y:,.3f} m³<extra></extra>'
-        )
-        st.plotly_chart(apply_chart_theme(fig_acc), use_container_width=True)
+        render_weekly_tab(file_keys, start_d, end_d, current_theme_colors)
 
     # --- MONTHLY ANALYSIS ---
     with tab_month:
-        st.subheader("Monthly Analytics")
-        
-        # Monthly Trajectory Chart
-        st.markdown("#### 🎯 Monthly Trajectory: Actual vs Forecast")
-        if not daily_comparison.empty:
-            # Calculate monthly cumulative
-            daily_comparison['Month'] = daily_comparison['Date'].dt.strftime('%B %Y')
-            monthly_cum = daily_comparison.groupby('Month').agg({
-                'Total Production': 'sum',
-                'Expected Production': 'sum'
-            }).reset_index()
-            
-            fig_traj = go.Figure()
-            fig_traj.add_trace(go.Bar(
-                x=monthly_cum['Month'],
-                y=monthly_cum['Total Production'],
-                name='Actual Production',
-                marker_color='#3b82f6',
-                text=monthly_cum['Total Production'].apply(lambda x: f"{x:,.0f}"),
-                textposition='outside'
-            ))
-            fig_traj.add_trace(go.Bar(
-                x=monthly_cum['Month'],
-                y=monthly_cum['Expected Production'],
-                name='Expected Production',
-                marker_color='#ef4444',
-                text=monthly_cum['Expected Production'].apply(lambda x: f"{x:,.0f}"),
-                textposition='outside'
-            ))
-            
-            fig_traj.update_layout(
-                title="Monthly Actual vs Expected Production",
-                barmode='group',
-                yaxis_title="Production Volume (m³)"
-            )
-            st.plotly_chart(apply_chart_theme(fig_traj), use_container_width=True)
-        
-        # Standard Monthly Charts
-        month_agg = df_filtered.groupby(['Plant', pd.Grouper(key='Date', freq='M')]).agg({
-            'Production for the Day': ['sum', 'mean'],
-            'Accumulative Production': 'max'
-        }).reset_index()
-        month_agg.columns = ['Plant', 'Date', 'Total Production', 'Avg Production', 'Accumulative']
-        month_agg['Month Label'] = month_agg['Date'].dt.strftime('%B %Y')
-        
-        month_agg = month_agg[(month_agg['Date'] >= pd.to_datetime(start_d)) & (month_agg['Date'] <= pd.to_datetime(end_d))]
-
-        # NEW: Additional charts for Monthly analysis
-        st.markdown("#### 📊 Monthly Production Analysis")
-        
-        col_m1, col_m2 = st.columns(2)
-        
-        with col_m1:
-            # Chart 1: Monthly Total Production (Sum)
-            fig_m1 = px.bar(month_agg, x='Month Label', y='Total Production', color='Plant', 
-                           title="Monthly Total Production (Sum)", barmode='group',
-                           text='Plant',
-                           color_discrete_sequence=current_theme_colors)
-            fig_m1.update_traces(
-                hovertemplate='<b>Month: %{x}</b><br>Plant: %{text}<br>Total: %{y:,.3f} m³<extra></extra>'
-            )
-            st.plotly_chart(apply_chart_theme(fig_m1), use_container_width=True)
-            
-            # NEW Chart 3: Monthly Production Stacked Area
-            fig_m3 = px.area(month_agg, x='Month Label', y='Total Production', color='Plant',
-                            title="Monthly Production Distribution (Stacked)",
-                            text='Plant',
-                            color_discrete_sequence=current_theme_colors)
-            fig_m3.update_traces(
-                hovertemplate='<b>Month: %{x}</b><br>Plant: %{text}<br>Total: %{y:,.3f} m³<extra></extra>'
-            )
-            st.plotly_chart(apply_chart_theme(fig_m3), use_container_width=True)
-            
-        with col_m2:
-            # Chart 2: Monthly Average Production (Mean)
-            fig_m2 = px.bar(month_agg, x='Month Label', y='Avg Production', color='Plant', 
-                           title="Monthly Average Production (Mean)", barmode='group',
-                           text='Plant',
-                           color_discrete_sequence=current_theme_colors)
-            fig_m2.update_traces(
-                hovertemplate='<b>Month: %{x}</b><br>Plant: %{text}<br>Average: %{y:,.3f} m³<extra></extra>'
-            )
-            st.plotly_chart(apply_chart_theme(fig_m2), use_container_width=True)
-            
-            # NEW Chart 4: Monthly Production Heatmap
-            # Create pivot table for heatmap
-            pivot_df = month_agg.pivot_table(
-                index='Plant', 
-                columns='Month Label', 
-                values='Total Production',
-                aggfunc='sum'
-            ).fillna(0)
-            
-            fig_m4 = px.imshow(
-                pivot_df,
-                labels=dict(x="Month", y="Plant", color="Production"),
-                title="Monthly Production Heatmap by Plant",
-                aspect="auto"
-            )
-            fig_m4.update_xaxes(side="top")
-            st.plotly_chart(apply_chart_theme(fig_m4), use_container_width=True)
-        
-        # Monthly Accumulative Trend
-        st.markdown("#### 📈 Monthly Accumulative Trend")
-        fig_acc_m = px.line(month_agg, x='Month Label', y='Accumulative', color='Plant', markers=True,
-                            title="Monthly Accumulative Production",
-                            text='Plant',
-                            color_discrete_sequence=current_theme_colors)
-        fig_acc_m.update_traces(
-            hovertemplate='<b>Month: %{x}</b><br>Plant: %{text}<br>Accumulative: %{y:,.3f} m³<extra></extra>'
-        )
-        st.plotly_chart(apply_chart_theme(fig_acc_m), use_container_width=True)
+        render_monthly_tab(file_keys, start_d, end_d, current_theme_colors, daily_comparison)
 
 # ========================================
 # MODULE 2: UPLOAD DATA
@@ -1133,7 +1662,7 @@ elif mode == "Upload New Data":
                     attempt_git_push(save_path, f"Add {sel_date}")
                     
                     # Show Success
-                    df_disp = df_clean[~df_clean["Plant"].astype(str).str.upper().str.contains("TOTAL")]
+                    df_disp = drop_total_rows(df_clean)
                     df_disp = safe_numeric(df_disp)
                     tot = df_disp["Production for the Day"].sum()
                     st.success(f"Saved! Total: {format_m3(tot)}")
@@ -1151,9 +1680,10 @@ elif mode == "Data Management":
             with st.expander(f"📂 {f}", expanded=False):
                 c1, c2 = st.columns(2)
                 with c1:
-                    df = load_saved(f)
-                    xl = generate_excel_report(df, f)
-                    st.download_button("Download", xl, f"{f}.xlsx", key=f"d_{f}")
+                    # Each workbook is built once per file version; later renders reuse the cached bytes
+                    st.download_button("Download", saved_excel_report(f, (DATA_DIR / f"{f}.csv").stat().st_mtime),
+                                       f"{f}.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                                       key=f"d_{f}")
                 with c2:
                     if st.button("Delete", key=f"del_{f}", type="primary"):
                         if delete_saved(f):
@@ -1165,136 +1695,13 @@ elif mode == "Data Management":
 # ========================================
 elif mode == "Historical Archives":
     st.title("Historical Data")
-    files = list_saved_dates()
+    file_dates = saved_dates_index()
     
-    if not files: 
+    if not file_dates: 
         st.info("No historical records found.")
         st.stop()
     
-    # Initialize session state with proper error handling
-    if "hist_d" not in st.session_state:
-        try:
-            # Try to parse the first valid date
-            st.session_state.hist_d = datetime.strptime(files[0], "%Y-%m-%d").date()
-        except (ValueError, IndexError):
-            # If parsing fails, use today's date
-            st.session_state.hist_d = datetime.today().date()
-    
-    # Create a dropdown with formatted dates for better UX
-    formatted_dates = []
-    for f in files:
-        try:
-            dt = datetime.strptime(f, "%Y-%m-%d")
-            formatted_dates.append((dt, f"{dt.strftime('%B %d, %Y')} ({f})"))
-        except ValueError:
-            continue
-    
-    if not formatted_dates:
-        st.error("No valid date files found.")
-        st.stop()
-    
-    # Sort by date descending
-    formatted_dates.sort(key=lambda x: x[0], reverse=True)
-    
-    # Create dropdown options
-    date_options = [fd[1] for fd in formatted_dates]
-    date_values = [fd[0].date() for fd in formatted_dates]
-    
-    # Find current selection index
-    current_index = 0
-    for i, (dt, _) in enumerate(formatted_dates):
-        if dt.date() == st.session_state.hist_d:
-            current_index = i
-            break
-    
-    # Date selection with dropdown
-    selected_option = st.selectbox(
-        "Select Date", 
-        options=date_options,
-        index=current_index,
-        key="hist_date_select"
-    )
-    
-    # Find the selected date
-    sel_d = None
-    for dt, option in formatted_dates:
-        if option == selected_option:
-            sel_d = dt.date()
-            break
-    
-    if sel_d is None:
-        sel_d = formatted_dates[0][0].date()
-    
-    st.session_state.hist_d = sel_d
-    d_str = sel_d.strftime("%Y-%m-%d")
-    
-    if d_str in files:
-        df = load_saved(d_str)
-        df = df[~df["Plant"].astype(str).str.upper().str.contains("TOTAL")]
-        df = safe_numeric(df)
-        tot = df["Production for the Day"].sum()
-        
-        # Get forecast for this day's month
-        month_forecast = get_forecast(sel_d.year, sel_d.month)
-        days_in_month = calendar.monthrange(sel_d.year, sel_d.month)[1]
-        expected_daily = month_forecast / days_in_month if days_in_month > 0 else 0
-        
-        st.markdown(f"""
-        <div style="background:{'#1e293b' if st.session_state['dark_mode'] else '#1e3a8a'}; color:white; padding:30px; border-radius:12px; margin-bottom:20px;">
-            <h2 style="margin:0; color:white !important;">{sel_d.strftime('%A, %B %d, %Y')}</h2>
-            <div style="font-size:3rem; font-weight:800;">{format_m3(tot)}</div>
-            <div style="font-size:1rem; margin-top:10px;">
-                Expected Daily: <span style="font-weight:600;">{format_m3(expected_daily)}</span> | 
-                Monthly Forecast: <span style="font-weight:600;">{format_m3(month_forecast)}</span>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-        st.dataframe(df, use_container_width=True)
-        
-        st.markdown("### 📊 Daily Analysis")
-        c1, c2 = st.columns(2)
-        with c1:
-            st.markdown("**Production Share**")
-            fig = px.pie(df, names='Plant', values='Production for the Day', color_discrete_sequence=current_theme_colors)
-            st.plotly_chart(apply_chart_theme(fig), use_container_width=True)
-        with c2:
-            st.markdown("**Production Volume**")
-            fig = px.bar(df, x='Plant', y='Production for the Day', color='Plant', text='Plant', color_discrete_sequence=current_theme_colors)
-            st.plotly_chart(apply_chart_theme(fig), use_container_width=True)
-            
-        st.markdown("### 📈 Accumulative Analysis")
-        c3, c4 = st.columns(2)
-        with c3:
-            st.markdown("**Accumulative by Plant**")
-            fig_acc_bar = px.bar(df, x='Plant', y='Accumulative Production', color='Plant', text='Plant', color_discrete_sequence=current_theme_colors)
-            st.plotly_chart(apply_chart_theme(fig_acc_bar), use_container_width=True)
-        with c4:
-            st.markdown("**Accumulative Share**")
-            fig_acc_pie = px.pie(df, names='Plant', values='Accumulative Production', color_discrete_sequence=current_theme_colors)
-            st.plotly_chart(apply_chart_theme(fig_acc_pie), use_container_width=True)
-        
-        # NEW: Actual vs Expected Chart for Historical View
-        st.markdown("### 🎯 Actual vs Expected Production")
-        
-        # Create comparison data
-        comparison_data = pd.DataFrame({
-            'Metric': ['Actual Production', 'Expected Production'],
-            'Value': [tot, expected_daily],
-            'Color': ['#3b82f6', '#ef4444']
-        })
-        
-        fig_comparison = px.bar(
-            comparison_data, 
-            x='Metric', 
-            y='Value', 
-            color='Metric',
-            title=f"Daily Production Comparison for {sel_d.strftime('%B %d, %Y')}",
-            color_discrete_map={'Actual Production': '#3b82f6', 'Expected Production': '#ef4444'},
-            text=comparison_data['Value'].apply(lambda x: format_m3(x))
-        )
-        fig_comparison.update_traces(textposition='outside')
-        fig_comparison.update_layout(showlegend=False)
-        st.plotly_chart(apply_chart_theme(fig_comparison), use_container_width=True)
+    render_archive_day(file_dates, current_theme_colors)
 
 # ========================================
 # MODULE 5: AUDIT LOGS (MANAGER ONLY)
@@ -1308,15 +1715,16 @@ elif mode == "Audit Logs":
     
     logs = get_logs()
     if not logs.empty:
-        logs['Timestamp'] = pd.to_datetime(logs['Timestamp'])
         # Filter Logic
         start_ts = pd.to_datetime(log_date)
         end_ts = start_ts + timedelta(days=1)
-        daily_logs = logs[(logs['Timestamp'] >= start_ts) & (logs['Timestamp'] < end_ts)].sort_values('Timestamp', ascending=False)
+        # Logs come sorted by time, so the day is a binary-searched slice; newest first for display
+        lo, hi = logs['Timestamp'].searchsorted([start_ts, end_ts])
+        daily_logs = logs.iloc[lo:hi].iloc[::-1]
         
         st.markdown(f"**Showing logs for: {log_date.strftime('%Y-%m-%d')}**")
         st.dataframe(daily_logs, use_container_width=True, height=500)
-        st.download_button("Export CSV", daily_logs.to_csv(index=False).encode(), "logs.csv", "text/csv")
+        st.download_button("Export CSV", csv_bytes(daily_logs), "logs.csv", "text/csv")
     else:
         st.info("No logs found.")
 